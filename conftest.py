@@ -0,0 +1 @@
+# Present so pytest puts the repo root on sys.path for tests/.
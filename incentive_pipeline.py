@@ -0,0 +1,543 @@
+"""Incentive calculation pipeline.
+
+Pure pandas code shared by the dashboard (streamlit_app.py) and the
+background precompute worker (precompute_worker.py). Nothing in here
+touches Streamlit.
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import requests
+
+# =========================================================
+# 1) GOOGLE SHEET URL
+# =========================================================
+
+SHEET_URL = os.environ.get(
+    "INCENTIVE_SHEET_URL",
+    "https://script.google.com/macros/s/AKfycbzp20rll0uyWA6TbKvEsZIBM9m6uzfiu8O4sSsozxeZAQiNst7zW1fDy3Maq4cgh6x95w/exec",
+)
+
+def fetch_sheet(url=SHEET_URL):
+    """Download the raw sheet export (a JSON list of rows, header first)."""
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    return response.content
+
+def sheet_to_dataframe(raw):
+    data = json.loads(raw)
+    return pd.DataFrame(data[1:], columns=data[0])
+
+# =========================================================
+# 2) TABLE DATA WITH DIFFERENT SLABS FOR EACH PERSON
+# =========================================================
+
+table_data = {
+    # TEAM 1
+    "Nisha Samuel": [298690, 90000, 2100, 300000, 7050, 750000, 10290, 1020000],
+    "Bindu -": [353694, 130000, 4900, 620000, 9520, 1040000, 15760, 1560000],
+    "Remya Raghunath": [257716, 110000, 3500, 460000, 8340, 900000, 12660, 1260000],
+    "Jibymol Varghese": [215973, 100000, 3200, 420000, 7710, 830000, 11430, 1140000],
+    "akhila shaji": [218119, 100000, 3400, 440000, 8240, 880000, 12080, 1200000],
+    "Geethu Babu": [190431, 110000, 3500, 460000, 8340, 900000, 12660, 1260000],
+    "parvathy R": [126050, 80000, 2500, 330000, 6130, 660000, 9010, 900000],
+    "Arya S": [187849, 80000, 2500, 330000, 6130, 660000, 9010, 900000],
+    
+    # TEAM 2
+    "Remya Ravindran": [205280, 100000, 3400, 440000, 8240, 880000, 12080, 1200000],
+    "Sumithra -": [202138, 120000, 4100, 530000, 9930, 1060000, 14490, 1440000],
+    "Jayasree -": [274577, 90000, 3100, 400000, 7500, 800000, 10860, 1080000],
+    "SANIJA K P": [118004, 90000, 3100, 400000, 7500, 800000, 10860, 1080000],
+    "Shubha Lakshmi": [233883, 90000, 3100, 400000, 7500, 800000, 10860, 1080000],
+    "Arya Bose": [114519, 100000, 3400, 440000, 8240, 880000, 12080, 1200000],
+    "Aneena Elsa Shibu": [220605, 90000, 3100, 400000, 7500, 800000, 10860, 1080000],
+    "Merin j": [234160, 100000, 3200, 420000, 7710, 830000, 11430, 1140000]
+}
+
+# Progressive rates
+slab_rates = {1: 100, 2: 110, 3: 120, 4: 130}
+
+# Define courses with their search patterns
+course_patterns = {
+    "OET": ["oet"],
+    "PTE": ["pte"],
+    "IELTS": ["ielts"],
+    "German": ["german", "deutsch"],
+    "Prometric": ["prometric"],
+    "Nclex-RN": ["nclex", "nclex-rn"],
+    "DM": ["digital marketing", "dm", "digital marketing full package"],
+    "Fluency": ["fluency"],
+    "Media": [
+        "media",
+        "diploma in cinematography and photography",
+        "diploma in editing & colour grading", 
+        "diploma in editing and colour grading",
+        "diploma in scriptwriting and direction",
+        "cinematography",
+        "photography",
+        "editing",
+        "colour grading",
+        "scriptwriting",
+        "direction"
+    ]
+}
+
+# Closed deals needed per course
+target_per_course = 3
+
+# Add table data for comparison
+def add_table_data(row):
+    name = row["Name"]
+    data = table_data.get(name, [0]*8)
+    
+    return pd.Series({
+        "Table GST Revenue": data[0],
+        "Table Net Revenue": data[0] / 1.18,
+        "First Slab": data[1],
+        "First Incentive at Target": data[2],
+        "Second Slab": data[3],
+        "Second Incentive at Target": data[4],
+        "Third Slab": data[5],
+        "Third Incentive at Target": data[6],
+        "Fourth Slab": data[7]
+    })
+
+# Calculate slab-wise incentive based on TOTAL net revenue
+def calculate_incentive_different_slabs(row):
+    name = row["Name"]
+    total_net = row["Total Net Revenue"]  # From ALL deals
+    
+    data = table_data.get(name, [0]*8)
+    first_slab = data[1]
+    second_slab = data[3]
+    third_slab = data[5]
+    fourth_slab = data[7]
+    
+    incentive = 0
+    current_slab = "Not Reached"
+    
+    # Check if eligible
+    if total_net < first_slab:
+        return incentive, current_slab
+    
+    # SLAB 1: First to Second slab
+    if total_net < second_slab:
+        current_slab = "First Slab"
+        amount_in_slab1 = total_net - first_slab
+        blocks_slab1 = math.floor(amount_in_slab1 / 10000)
+        incentive = blocks_slab1 * slab_rates[1]
+    
+    # SLAB 2: Second to Third slab
+    elif total_net < third_slab:
+        current_slab = "Second Slab"
+        
+        # Slab 1 (full)
+        slab1_amount = second_slab - first_slab
+        slab1_blocks = math.floor(slab1_amount / 10000)
+        slab1_inc = slab1_blocks * slab_rates[1]
+        
+        # Slab 2 (partial)
+        slab2_amount = total_net - second_slab
+        slab2_blocks = math.floor(slab2_amount / 10000)
+        slab2_inc = slab2_blocks * slab_rates[2]
+        
+        incentive = slab1_inc + slab2_inc
+    
+    # SLAB 3: Third to Fourth slab
+    elif total_net < fourth_slab:
+        current_slab = "Third Slab"
+        
+        # Slab 1 (full)
+        slab1_amount = second_slab - first_slab
+        slab1_blocks = math.floor(slab1_amount / 10000)
+        slab1_inc = slab1_blocks * slab_rates[1]
+        
+        # Slab 2 (full)
+        slab2_amount = third_slab - second_slab
+        slab2_blocks = math.floor(slab2_amount / 10000)
+        slab2_inc = slab2_blocks * slab_rates[2]
+        
+        # Slab 3 (partial)
+        slab3_amount = total_net - third_slab
+        slab3_blocks = math.floor(slab3_amount / 10000)
+        slab3_inc = slab3_blocks * slab_rates[3]
+        
+        incentive = slab1_inc + slab2_inc + slab3_inc
+    
+    # SLAB 4: Above Fourth slab
+    else:
+        current_slab = "Fourth Slab"
+        
+        # Slab 1 (full)
+        slab1_amount = second_slab - first_slab
+        slab1_blocks = math.floor(slab1_amount / 10000)
+        slab1_inc = slab1_blocks * slab_rates[1]
+        
+        # Slab 2 (full)
+        slab2_amount = third_slab - second_slab
+        slab2_blocks = math.floor(slab2_amount / 10000)
+        slab2_inc = slab2_blocks * slab_rates[2]
+        
+        # Slab 3 (full)
+        slab3_amount = fourth_slab - third_slab
+        slab3_blocks = math.floor(slab3_amount / 10000)
+        slab3_inc = slab3_blocks * slab_rates[3]
+        
+        # Slab 4 (partial)
+        slab4_amount = total_net - fourth_slab
+        slab4_blocks = math.floor(slab4_amount / 10000)
+        slab4_inc = slab4_blocks * slab_rates[4]
+        
+        incentive = slab1_inc + slab2_inc + slab3_inc + slab4_inc
+    
+    return incentive, current_slab
+
+# =========================================================
+# 3) AMOUNT PARSING
+# =========================================================
+
+# Currency markers with the spaces around them, and the "/-" that often ends
+# rupee amounts, dropped before the number is checked. Any other whitespace
+# stays, so "1 5" is rejected rather than read as 15.
+# (Patterns are plain strings with inline flags so pyarrow can run them.)
+_AMOUNT_NOISE = r"(?i)\s*(?:₹|rs\.?|inr)\s*|\s*/-$"
+
+# Plain digits, western grouping (1,234,567) or Indian grouping (12,34,567),
+# optionally signed or wrapped in parentheses (negative)
+_NUMBER = r"(?:\d+|\d{1,3}(?:,\d{3})+|\d{1,2}(?:,\d{2})+,\d{3})(?:\.\d+)?"
+_AMOUNT_PATTERN = rf"(?:-?{_NUMBER}|\({_NUMBER}\))"
+
+def parse_amounts(values):
+    """Parse sheet Amount cells such as "₹1,20,000", "₹1,20,000/-",
+    "1,20,000.00", "12000 " or "(5,000)" (negative) into floats.
+
+    Commas must form valid western or Indian digit groups, and digits may not
+    be split by spaces, so "1,5", "1,2,3" or "1 5" are rejected rather than
+    read as 15 or 123. Each distinct value is parsed once (pd.factorize),
+    with the string work done by pyarrow kernels, and the results are
+    broadcast back to the rows with a single array lookup.
+
+    Returns (amounts, rejected): blank cells become NaN as before, and
+    `rejected` counts non-blank cells that could not be parsed.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float), 0
+
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = np.full(len(uniques), np.nan)
+
+    # Sort the distinct values by type; type() runs in C, and the subclass
+    # check only runs once per distinct type
+    kinds = uniques.map(type)
+    number_kinds = [
+        kind for kind in kinds.unique()
+        if issubclass(kind, (int, float, np.number)) and not issubclass(kind, bool)
+    ]
+    is_number = kinds.isin(number_kinds).to_numpy(dtype=bool)
+    is_text = (kinds == str).to_numpy(dtype=bool)
+
+    # Cells the sheet already exported as numbers need no string parsing
+    parsed[is_number] = uniques[is_number].to_numpy(dtype=float)
+
+    # The string work runs on Arrow strings, in pyarrow's compute kernels
+    text = pd.Series(uniques[is_text].to_numpy(), dtype="string[pyarrow]").str.strip()
+    text_blank = (text == "").to_numpy(dtype=bool)
+    text = text.str.replace(_AMOUNT_NOISE, "", regex=True)
+    text_valid = text.str.fullmatch(_AMOUNT_PATTERN).to_numpy(dtype=bool)
+
+    digits = text[text_valid]
+    sign = np.where(digits.str.startswith("(").to_numpy(dtype=bool), -1.0, 1.0)
+    valid_rows = np.flatnonzero(is_text)[text_valid]
+    parsed[valid_rows] = sign * digits.str.replace(r"[(),]", "", regex=True).astype(float).to_numpy()
+
+    # Anything else (unparseable text, booleans, dates) is rejected
+    blank = np.zeros(len(uniques), dtype=bool)
+    blank[is_text] = text_blank
+    rejected = np.isnan(parsed) & ~blank
+
+    # Code -1 marks a missing cell; the appended slot maps it to NaN
+    amounts = np.append(parsed, np.nan)[codes]
+    rejected_count = int(np.append(rejected, False)[codes].sum())
+
+    return pd.Series(amounts, index=values.index), rejected_count
+
+# =========================================================
+# 4) SCHEMA RESOLUTION
+# =========================================================
+
+# Columns the pipeline reads, in the order of their positional fallbacks
+SCHEMA_COLUMNS = ["Deal owner", "Amount", "Close Date", "Course"]
+
+# Resolved schemas keyed by header fingerprint; shared by session threads
+_schema_cache = {}
+_schema_lock = threading.Lock()
+
+def header_fingerprint(header):
+    return hashlib.sha256("\x1f".join(header).encode("utf-8")).hexdigest()[:16]
+
+def _build_schema(header, fingerprint):
+    # Find candidate columns by name
+    matches = {name: [] for name in SCHEMA_COLUMNS}
+    for position, col in enumerate(header):
+        col_lower = col.lower()
+        if 'deal' in col_lower and 'owner' in col_lower:
+            matches["Deal owner"].append(position)
+        elif 'amount' in col_lower or 'value' in col_lower:
+            matches["Amount"].append(position)
+        elif 'close' in col_lower and 'date' in col_lower:
+            matches["Close Date"].append(position)
+        elif 'course' in col_lower or 'product' in col_lower:
+            matches["Course"].append(position)
+
+    # Columns found by name come first; the last match wins
+    columns = {}
+    warnings = []
+    for name, found in matches.items():
+        if found:
+            columns[name] = found[-1]
+            if len(found) > 1:
+                candidates = ", ".join(f"'{header[i]}'" for i in found)
+                warnings.append(f"Several columns look like {name} ({candidates}); using '{header[found[-1]]}'.")
+
+    # Use default positions for the rest, but never a column that matched by name
+    claimed = {position for found in matches.values() for position in found}
+    for fallback, name in enumerate(SCHEMA_COLUMNS):
+        if name in columns:
+            continue
+        if fallback < len(header) and fallback not in claimed:
+            columns[name] = fallback
+            claimed.add(fallback)
+            warnings.append(f"No {name} column found by name; using column {fallback + 1} ('{header[fallback]}').")
+        elif name == "Close Date":
+            # Without a close date every deal counts as closed
+            columns[name] = None
+            warnings.append("No Close Date column found; counting every deal as closed.")
+        else:
+            raise ValueError(f"Sheet has no {name} column (header: {header})")
+    columns = {name: columns[name] for name in SCHEMA_COLUMNS}
+
+    return {"fingerprint": fingerprint, "header": header, "columns": columns, "warnings": warnings}
+
+def resolve_schema(columns):
+    """Work out which sheet columns feed the pipeline.
+
+    The mapping is resolved and validated once per distinct header and
+    cached by the header's fingerprint, so unchanged sheets skip the name
+    matching. Fallbacks and ambiguous matches are reported in the schema's
+    "warnings"; they describe the mapping itself, not how the header got
+    there (see header_changes()).
+    """
+    header = [str(col).strip() for col in columns]
+    fingerprint = header_fingerprint(header)
+
+    with _schema_lock:
+        schema = _schema_cache.get(fingerprint)
+        if schema is None:
+            schema = _build_schema(header, fingerprint)
+            _schema_cache[fingerprint] = schema
+
+    return schema
+
+def header_changes(previous_header, header):
+    """Describe how `header` differs from `previous_header`, if at all.
+
+    Returns a list with at most one message. Callers compare against the
+    header they last processed and should report the result once.
+    """
+    if previous_header is None or previous_header == header:
+        return []
+
+    added = [col for col in header if col not in previous_header]
+    removed = [col for col in previous_header if col not in header]
+    if added or removed:
+        return [f"Sheet header changed: added {added}, removed {removed}."]
+    return ["Sheet columns were reordered."]
+
+def extract_deals(full_df):
+    """Select only the schema columns, by position, under canonical names.
+
+    Returns (deals, schema, rejected_amounts), with Amount already parsed.
+    """
+    schema = resolve_schema(full_df.columns)
+    names = [name for name in SCHEMA_COLUMNS if schema["columns"][name] is not None]
+
+    deals = full_df.iloc[:, [schema["columns"][name] for name in names]].copy()
+    deals.columns = names
+    deals["Amount"], rejected_amounts = parse_amounts(deals["Amount"])
+
+    return deals, schema, rejected_amounts
+
+# =========================================================
+# 5) COMPUTE INCENTIVES
+# =========================================================
+
+def compute_incentives(full_df):
+    """Run the full incentive pipeline on the raw sheet data.
+
+    Returns a dict with everything the dashboard sections render.
+    """
+
+    # Pull just the columns we need, under canonical names
+    deals, schema, rejected_amounts = extract_deals(full_df)
+
+    # Create TWO dataframes:
+    # 1. For revenue calculation (ALL deals)
+    # 2. For course count (only CLOSED deals)
+
+    # ALL deals for revenue
+    revenue_df = deals[["Deal owner", "Amount"]].copy()
+
+    # CLOSED deals only for course count
+    if "Close Date" in deals.columns:
+        closed_df = deals[["Deal owner", "Close Date", "Course"]].copy()
+        # Filter for closed deals only
+        closed_df = closed_df[closed_df["Close Date"].notna() & (closed_df["Close Date"].astype(str).str.strip() != "")]
+    else:
+        # If no close date column, use all deals for course count
+        closed_df = deals[["Deal owner", "Course"]].copy()
+
+    # Summarize ALL revenue (not just closed deals)
+    summary = revenue_df.groupby("Deal owner")["Amount"].sum().reset_index()
+    summary.columns = ["Name", "Total GST Revenue"]
+
+    # Calculate NET Revenue (remove 18% GST) - from ALL deals
+    summary["Total Net Revenue"] = np.floor(summary["Total GST Revenue"] / 1.18)
+    summary["GST Amount"] = summary["Total GST Revenue"] - summary["Total Net Revenue"]
+
+    # Add table data for comparison
+    table_info = summary.apply(add_table_data, axis=1)
+    summary = pd.concat([summary, table_info], axis=1)
+
+    # Apply calculation
+    results = summary.apply(calculate_incentive_different_slabs, axis=1, result_type='expand')
+    results.columns = ["First Incentive", "Current Slab"]
+    summary = pd.concat([summary, results], axis=1)
+
+    # Create a dictionary to store course counts and top performers
+    course_top_performers = {}
+    course_summary_data = []
+
+    # Count CLOSED admissions per course per person
+    for course_name, patterns in course_patterns.items():
+        # Create a mask for this course using all patterns
+        course_mask = pd.Series(False, index=closed_df.index)
+        for pattern in patterns:
+            course_mask = course_mask | closed_df["Course"].astype(str).str.contains(pattern, case=False, na=False)
+        
+        course_counts = closed_df[course_mask].groupby("Deal owner").size().reset_index()
+        course_counts.columns = ["Name", f"{course_name}_Closed_Count"]
+        
+        # Merge with summary
+        summary = pd.merge(summary, course_counts, on="Name", how="left")
+        summary[f"{course_name}_Closed_Count"] = summary[f"{course_name}_Closed_Count"].fillna(0).astype(int)
+        
+        # Find top performer(s) for this course
+        if not course_counts.empty:
+            top_count = course_counts[f"{course_name}_Closed_Count"].max()
+            top_performers = course_counts[course_counts[f"{course_name}_Closed_Count"] == top_count]["Name"].tolist()
+            course_top_performers[course_name] = {"count": top_count, "names": top_performers}
+        
+        # Calculate course summary
+        total_admissions = course_counts[f"{course_name}_Closed_Count"].sum() if not course_counts.empty else 0
+        people_with_course = len(course_counts) if not course_counts.empty else 0
+        met_target = len(course_counts[course_counts[f"{course_name}_Closed_Count"] >= target_per_course]) if not course_counts.empty else 0
+        
+        course_summary_data.append({
+            "Course": course_name,
+            "Total Admissions": total_admissions,
+            "People with Course": people_with_course,
+            "Met Target (≥3)": met_target,
+            "Below Target": people_with_course - met_target,
+            "Top Performer Count": top_count if not course_counts.empty else 0,
+            "Top Performers": ", ".join(top_performers) if not course_counts.empty else "None"
+        })
+
+    # Initialize columns
+    summary["Total_Penalty"] = 0.0
+    summary["Total_Reward"] = 0.0
+    summary["Final_Incentive"] = summary["First Incentive"].copy()
+
+    # Store detailed penalty/reward info
+    penalty_reward_details = {}
+
+    # Apply penalty per course
+    for course_name in course_patterns.keys():
+        # Add columns for this course
+        summary[f"{course_name}_Penalty"] = 0.0
+        summary[f"{course_name}_Reward"] = 0.0
+        
+        # Get people with this course (who have at least 1 closed deal)
+        course_people = summary[summary[f"{course_name}_Closed_Count"] > 0].copy()
+        
+        if len(course_people) > 0:
+            # Find below target people (< 3 closed deals)
+            below_target = course_people[course_people[f"{course_name}_Closed_Count"] < target_per_course]
+            
+            if len(below_target) > 0:
+                # Find ALL top performers (max closed deals count)
+                max_count = course_people[f"{course_name}_Closed_Count"].max()
+                top_performers = course_people[course_people[f"{course_name}_Closed_Count"] == max_count]["Name"].tolist()
+                
+                # Apply 11% penalty to below-target people
+                total_penalty = 0.0
+                penalty_details = []
+                
+                for _, person in below_target.iterrows():
+                    name = person["Name"]
+                    penalty_amount = person["First Incentive"] * 0.11
+                    
+                    # Apply penalty
+                    mask = summary["Name"] == name
+                    summary.loc[mask, f"{course_name}_Penalty"] = penalty_amount
+                    summary.loc[mask, "Total_Penalty"] += penalty_amount
+                    summary.loc[mask, "Final_Incentive"] -= penalty_amount
+                    
+                    total_penalty += penalty_amount
+                    penalty_details.append({
+                        "person": name,
+                        "count": person[f"{course_name}_Closed_Count"],
+                        "penalty": penalty_amount,
+                        "first_incentive": person["First Incentive"]
+                    })
+                
+                # Split penalty equally among ALL top performers
+                if total_penalty > 0 and len(top_performers) > 0:
+                    reward_per_person = total_penalty / len(top_performers)
+                    
+                    for top_name in top_performers:
+                        if top_name in summary["Name"].values:
+                            top_mask = summary["Name"] == top_name
+                            summary.loc[top_mask, f"{course_name}_Reward"] = reward_per_person
+                            summary.loc[top_mask, "Total_Reward"] += reward_per_person
+                            summary.loc[top_mask, "Final_Incentive"] += reward_per_person
+                    
+                    # Store details for display
+                    penalty_reward_details[course_name] = {
+                        "total_penalty": total_penalty,
+                        "top_performers": top_performers,
+                        "reward_per_person": reward_per_person,
+                        "penalty_details": penalty_details,
+                        "max_count": max_count
+                    }
+
+    # Calculate net adjustment
+    summary["Net_Adjustment"] = summary["Total_Reward"] - summary["Total_Penalty"]
+
+    return {
+        "summary": summary,
+        "revenue_df": revenue_df,
+        "closed_df": closed_df,
+        "course_summary_df": pd.DataFrame(course_summary_data),
+        "course_top_performers": course_top_performers,
+        "penalty_reward_details": penalty_reward_details,
+        "rejected_amounts": rejected_amounts,
+        "schema": schema,
+    }
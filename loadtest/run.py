@@ -0,0 +1,228 @@
+"""Drive concurrent dashboard sessions against a stand-in sheet server.
+
+Starts the stand-in sheet server and a headless `streamlit run` of
+streamlit_app.py, opens N concurrent sessions over Streamlit's websocket
+protocol (the same one the browser uses), and reports time-to-render
+percentiles together with the Streamlit server's CPU time and peak RSS.
+
+    python -m loadtest.run --sessions 40 --renders 3 --rows 20000 --latency 2
+    python -m loadtest.run --sessions 40 --precompute   # serve from a snapshot
+
+Needs the `websockets` package (pip install -r requirements-dev.txt) and
+reads server stats from /proc, so it runs on Linux only.
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+import precompute_worker
+from loadtest.sheet_server import make_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class ProcessSampler(threading.Thread):
+    """Samples CPU time and RSS of a process from /proc until stopped."""
+
+    def __init__(self, pid, interval=0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self.cpu_start = self.cpu_seconds()
+        self.cpu_end = self.cpu_start
+        self._stop_event = threading.Event()
+
+    def cpu_seconds(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            # Fields after the parenthesised command name; utime and stime are 14 and 15
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    def rss_bytes(self):
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak_rss = max(self.peak_rss, self.rss_bytes())
+            self.cpu_end = self.cpu_seconds()
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.cpu_end = self.cpu_seconds()
+
+
+def start_streamlit(port, sheet_url, snapshot_dir):
+    # The snapshot is published once up front, with no worker to keep it fresh
+    env = dict(
+        os.environ,
+        INCENTIVE_SHEET_URL=sheet_url,
+        INCENTIVE_SNAPSHOT_DIR=snapshot_dir,
+        INCENTIVE_SNAPSHOT_MAX_AGE="inf",
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", "streamlit_app.py",
+            "--server.headless", "true",
+            "--server.port", str(port),
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    # Wait for the server to come up
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("streamlit exited during startup")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError("streamlit did not become healthy within 60s")
+
+
+def render_failure(delta):
+    """Describe the exception a delta renders, or None if it is not one."""
+    if delta.WhichOneof("type") != "new_element" or delta.new_element.WhichOneof("type") != "exception":
+        return None
+    exception = delta.new_element.exception
+    if exception.is_warning:
+        return None
+    return f"{exception.type}: {exception.message}"
+
+
+async def run_session(port, renders, timings, errors):
+    """One viewer: connect, then request `renders` full script runs in a row."""
+    try:
+        async with websockets.connect(
+            f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None
+        ) as ws:
+            for _ in range(renders):
+                msg = BackMsg()
+                msg.rerun_script.query_string = ""
+
+                start = time.perf_counter()
+                await ws.send(msg.SerializeToString())
+
+                # The page is rendered once the server reports the run finished;
+                # a run that raised renders an exception element instead
+                failure = None
+                while True:
+                    forward = ForwardMsg()
+                    forward.ParseFromString(await ws.recv())
+                    kind = forward.WhichOneof("type")
+                    if kind == "delta" and failure is None:
+                        failure = render_failure(forward.delta)
+                    elif kind == "script_finished":
+                        if forward.script_finished != ForwardMsg.FINISHED_SUCCESSFULLY and failure is None:
+                            failure = ForwardMsg.ScriptFinishedStatus.Name(forward.script_finished)
+                        break
+
+                if failure is None:
+                    timings.append(time.perf_counter() - start)
+                else:
+                    errors.append(failure)
+    except Exception as exc:
+        errors.append(repr(exc))
+
+
+async def run_sessions(port, sessions, renders):
+    timings, errors = [], []
+    await asyncio.gather(*(run_session(port, renders, timings, errors) for _ in range(sessions)))
+    return timings, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent dashboard sessions")
+    parser.add_argument("--renders", type=int, default=1, help="full page renders per session")
+    parser.add_argument("--rows", type=int, default=5000, help="deal rows in the synthetic sheet")
+    parser.add_argument("--latency", type=float, default=0.0, help="sheet server response delay in seconds")
+    parser.add_argument("--precompute", action="store_true", help="publish a snapshot before the sessions start")
+    args = parser.parse_args(argv)
+
+    sheet_server = make_server(args.rows, args.latency)
+    threading.Thread(target=sheet_server.serve_forever, daemon=True).start()
+    sheet_url = f"http://127.0.0.1:{sheet_server.server_port}/"
+
+    with tempfile.TemporaryDirectory(prefix="incentive-snapshots-") as snapshot_dir:
+        if args.precompute:
+            precompute_worker.refresh(sheet_url, snapshot_dir)
+
+        port = free_port()
+        process = start_streamlit(port, sheet_url, snapshot_dir)
+        sampler = ProcessSampler(process.pid)
+        sampler.start()
+
+        try:
+            wall_start = time.perf_counter()
+            timings, errors = asyncio.run(run_sessions(port, args.sessions, args.renders))
+            wall = time.perf_counter() - wall_start
+        finally:
+            sampler.stop()
+            process.terminate()
+            process.wait()
+            sheet_server.shutdown()
+
+    timings.sort()
+    cpu = sampler.cpu_end - sampler.cpu_start
+
+    print(
+        f"sessions={args.sessions} renders={args.renders} rows={args.rows} "
+        f"latency={args.latency}s precompute={'on' if args.precompute else 'off'}"
+    )
+    print(
+        f"time-to-render: p50 {percentile(timings, 50):.3f}s  p95 {percentile(timings, 95):.3f}s  "
+        f"p99 {percentile(timings, 99):.3f}s  max {timings[-1] if timings else float('nan'):.3f}s  "
+        f"(n={len(timings)}, errors={len(errors)})"
+    )
+    print(
+        f"server: {cpu:.2f}s CPU over {wall:.2f}s wall ({cpu / wall:.0%} of one core), "
+        f"peak RSS {sampler.peak_rss / 2**20:.1f} MiB"
+    )
+    for error in errors[:5]:
+        print(f"  error: {error}")
+
+
+if __name__ == "__main__":
+    main()
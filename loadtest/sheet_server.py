@@ -0,0 +1,94 @@
+"""Local stand-in for the Apps Script sheet endpoint.
+
+Serves a synthetic sheet in the same shape as the real export (a JSON list
+of rows, header first, with amounts both as numbers and as typed text like
+"₹1,20,000") with a configurable row count and response latency.
+Point the app at it with INCENTIVE_SHEET_URL.
+
+    python -m loadtest.sheet_server --rows 20000 --latency 2 --port 8765
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from incentive_pipeline import table_data
+
+HEADER = ["Deal Owner", "Amount", "Close Date", "Course Name"]
+
+COURSES = [
+    "OET Online Batch",
+    "PTE Academic",
+    "IELTS General",
+    "German A1",
+    "Prometric Exam Preparation",
+    "NCLEX-RN",
+    "Digital Marketing Full Package",
+    "Fluency Program",
+    "Diploma in Cinematography and Photography",
+    "Diploma in Editing & Colour Grading",
+    "Spoken English",
+]
+
+
+def rupees(amount):
+    """Format an amount the way it is often typed in: "₹1,20,000"."""
+    return "₹" + re.sub(r"(\d)(?=(?:\d\d)*\d{3}$)", r"\1,", str(amount))
+
+
+def synthetic_sheet(rows, seed=0):
+    """Build `rows` deal rows plus the header, shaped like the real export."""
+    rng = random.Random(seed)
+    owners = list(table_data) + ["Unassigned"]
+
+    sheet = [HEADER]
+    for _ in range(rows):
+        # A few blank amounts, ~30% typed as text and ~40% open deals, like
+        # the live sheet
+        amount = "" if rng.random() < 0.05 else rng.randint(5, 150) * 1000
+        if amount and rng.random() < 0.3:
+            amount = rupees(amount)
+        close_date = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() < 0.6 else ""
+        sheet.append([rng.choice(owners), amount, close_date, rng.choice(COURSES)])
+    return sheet
+
+
+def make_server(rows, latency=0.0, host="127.0.0.1", port=0, seed=0):
+    """Create (but do not start) a server answering every GET with the sheet."""
+    body = json.dumps(synthetic_sheet(rows, seed)).encode("utf-8")
+
+    class SheetHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            # Apps Script responses are slow; simulate that before answering
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), SheetHandler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000, help="deal rows in the sheet")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each response")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.rows, args.latency, args.host, args.port, args.seed)
+    print(f"Serving {args.rows} rows at http://{args.host}:{server.server_port}/")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
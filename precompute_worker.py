@@ -0,0 +1,78 @@
+"""Background worker that keeps the result snapshot in sync with the sheet.
+
+Polls the sheet, and whenever its contents change runs the full incentive
+pipeline once and publishes the result as a new snapshot. Dashboard sessions
+then just load the live snapshot instead of recomputing per viewer.
+
+    python precompute_worker.py                 # poll every 60 seconds
+    python precompute_worker.py --once          # refresh once and exit
+"""
+
+import argparse
+import logging
+import time
+
+import snapshots
+from incentive_pipeline import SHEET_URL, compute_incentives, fetch_sheet, header_changes, sheet_to_dataframe
+
+log = logging.getLogger("precompute_worker")
+
+
+def refresh(url=SHEET_URL, root=snapshots.SNAPSHOT_DIR):
+    """Recompute and publish if the sheet or the pipeline code changed.
+
+    Returns True if a new snapshot was published.
+    """
+    raw = fetch_sheet(url)
+    version = snapshots.snapshot_version(raw)
+
+    if version == snapshots.current_version(root):
+        snapshots.mark_checked(root)
+        return False
+
+    start = time.perf_counter()
+    results = compute_incentives(sheet_to_dataframe(raw))
+
+    # Compare with the header of the previous snapshot, persisted next to the
+    # snapshots so a restart does not lose it
+    header = results["schema"]["header"]
+    changes = header_changes(snapshots.last_header(root), header)
+
+    snapshots.write_snapshot(version, results, root, header_changes=changes)
+    snapshots.save_last_header(header, root)
+    snapshots.mark_checked(root)
+    snapshots.prune_snapshots(root=root)
+    log.info(
+        "Published snapshot %s in %.2fs (%d unreadable amounts)",
+        version, time.perf_counter() - start, results["rejected_amounts"],
+    )
+    for warning in changes + results["schema"]["warnings"]:
+        log.warning("Schema: %s", warning)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=SHEET_URL, help="sheet export URL")
+    parser.add_argument("--snapshot-dir", default=snapshots.SNAPSHOT_DIR)
+    parser.add_argument("--interval", type=float, default=60, help="seconds between polls")
+    parser.add_argument("--once", action="store_true", help="refresh once and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.once:
+        refresh(args.url, args.snapshot_dir)
+        return
+
+    while True:
+        try:
+            refresh(args.url, args.snapshot_dir)
+        except Exception:
+            # Keep serving the last good snapshot; try again next poll
+            log.exception("Refresh failed")
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Immutable, versioned result snapshots.
+
+The precompute worker writes every finished pipeline run into its own
+directory under the snapshot root and then atomically repoints CURRENT at
+it, so readers only ever see a complete snapshot: the old one or the new
+one, never a half-written mix.
+
+A version directory is written once and never changed; a sheet that goes
+back to earlier contents reuses it. What belongs to one publish (its time
+and the header changes it brought) lives in CURRENT instead, which is
+rewritten on every publish.
+
+Versions are "<pipeline version>-<sheet hash>". The pipeline version is a
+hash of the code that computes and stores results, so changing that code
+publishes fresh snapshots even for an unchanged sheet, and readers ignore
+snapshots written by different code.
+
+The worker also stamps LAST_CHECKED after every successful poll, changed
+or not, so readers can tell a quiet sheet from a dead worker.
+
+Layout:
+    <root>/CURRENT                          live version, publish time and
+                                            header changes (JSON)
+    <root>/LAST_CHECKED                     time of the worker's last good poll
+    <root>/LAST_HEADER                      last sheet header seen, by the worker
+                                            or a dashboard computing live
+    <root>/<version>/<frame>.arrow          DataFrames from compute_incentives()
+    <root>/<version>/values.json            its remaining (plain) values
+    <root>/<version>/final_incentive_report.csv
+
+DataFrames are stored as uncompressed Arrow IPC (Feather v2) files rather
+than pickles, so snapshots do not depend on the installed pandas version.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+import incentive_pipeline
+
+SNAPSHOT_DIR = os.environ.get("INCENTIVE_SNAPSHOT_DIR", "snapshots")
+
+# Readers stop trusting snapshots once the worker has been silent this long
+MAX_AGE = float(os.environ.get("INCENTIVE_SNAPSHOT_MAX_AGE", 300))
+
+CURRENT_FILE = "CURRENT"
+CHECKED_FILE = "LAST_CHECKED"
+HEADER_FILE = "LAST_HEADER"
+VALUES_FILE = "values.json"
+FRAME_SUFFIX = ".arrow"
+REPORT_FILE = "final_incentive_report.csv"
+
+
+def _pipeline_version():
+    digest = hashlib.sha256()
+    for path in (incentive_pipeline.__file__, __file__):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+PIPELINE_VERSION = _pipeline_version()
+
+
+def snapshot_version(raw):
+    """Snapshot version for a raw sheet export under the current code."""
+    return f"{PIPELINE_VERSION}-{hashlib.sha256(raw).hexdigest()[:16]}"
+
+
+def is_compatible(version):
+    """True if `version` was written by the code running in this process."""
+    return version.startswith(f"{PIPELINE_VERSION}-")
+
+
+def _replace_file(path, text):
+    # Write next to the target, then swap it in with a single rename
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}-", dir=os.path.dirname(path))
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+def _read_file(path):
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_publish(root=SNAPSHOT_DIR):
+    """Return the live publish record, or None if nothing is published.
+
+    The record has the snapshot's "version", its "published_at" time and
+    the "header_changes" reported when it was published.
+    """
+    text = _read_file(os.path.join(root, CURRENT_FILE))
+    if text is None:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        # Older code wrote the bare version
+        return {"version": text}
+
+
+def current_version(root=SNAPSHOT_DIR):
+    """Return the live snapshot version, or None if nothing is published."""
+    publish = current_publish(root)
+    return publish["version"] if publish else None
+
+
+def mark_checked(root=SNAPSHOT_DIR):
+    """Record that the worker just polled the sheet successfully."""
+    _replace_file(os.path.join(root, CHECKED_FILE), str(time.time()))
+
+
+def last_checked(root=SNAPSHOT_DIR):
+    """Time of the worker's last successful poll, or None if unknown."""
+    checked = _read_file(os.path.join(root, CHECKED_FILE))
+    return float(checked) if checked else None
+
+
+def worker_alive(root=SNAPSHOT_DIR):
+    """True if the worker polled the sheet within the last MAX_AGE seconds."""
+    checked = last_checked(root)
+    return checked is not None and time.time() - checked <= MAX_AGE
+
+
+def last_header(root=SNAPSHOT_DIR):
+    """Last sheet header seen, or None if unknown."""
+    header = _read_file(os.path.join(root, HEADER_FILE))
+    return json.loads(header) if header else None
+
+
+def save_last_header(header, root=SNAPSHOT_DIR):
+    # Dashboards computing live may run before any snapshot exists
+    os.makedirs(root, exist_ok=True)
+    _replace_file(os.path.join(root, HEADER_FILE), json.dumps(header))
+
+
+def _to_arrow(df):
+    # Arrow needs one type per column; sheet columns can mix numbers and text
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return pa.Table.from_pandas(df, preserve_index=True)
+
+
+def _json_default(value):
+    # numpy scalars from pandas reductions (counts, maxima)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def write_snapshot(version, results, root=SNAPSHOT_DIR, header_changes=()):
+    """Write results as snapshot `version` and make it the live one.
+
+    An existing directory for `version` is reused as is, but the publish
+    record in CURRENT is always written fresh.
+    """
+    os.makedirs(root, exist_ok=True)
+    snapshot_dir = os.path.join(root, version)
+
+    # Build the snapshot under a hidden temp name, then rename it into place
+    if not os.path.isdir(snapshot_dir):
+        tmp_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=root)
+        try:
+            values = {}
+            for key, value in results.items():
+                if isinstance(value, pd.DataFrame):
+                    path = os.path.join(tmp_dir, key + FRAME_SUFFIX)
+                    feather.write_feather(_to_arrow(value), path, compression="uncompressed")
+                else:
+                    values[key] = value
+            with open(os.path.join(tmp_dir, VALUES_FILE), "w") as f:
+                json.dump(values, f, default=_json_default)
+            results["summary"].to_csv(os.path.join(tmp_dir, REPORT_FILE), index=False)
+            os.chmod(tmp_dir, 0o755)
+            os.rename(tmp_dir, snapshot_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+    else:
+        # Republished: count it as new when pruning
+        os.utime(snapshot_dir)
+
+    _replace_file(os.path.join(root, CURRENT_FILE), json.dumps({
+        "version": version,
+        "published_at": time.time(),
+        "header_changes": list(header_changes),
+    }))
+
+
+def load_snapshot(version, root=SNAPSHOT_DIR):
+    """Load a published snapshot. Callers must treat the result as read-only.
+
+    The Arrow files are opened memory-mapped, so reading them involves no
+    deserialisation pass, but to_pandas() still builds in-memory DataFrames.
+    What keeps page loads cheap is loading each version once per process
+    and sharing it between sessions.
+    """
+    snapshot_dir = os.path.join(root, version)
+
+    with open(os.path.join(snapshot_dir, VALUES_FILE)) as f:
+        results = json.load(f)
+
+    for name in os.listdir(snapshot_dir):
+        if name.endswith(FRAME_SUFFIX):
+            table = feather.read_table(os.path.join(snapshot_dir, name), memory_map=True)
+            results[name[:-len(FRAME_SUFFIX)]] = table.to_pandas()
+
+    with open(os.path.join(snapshot_dir, REPORT_FILE), "rb") as f:
+        results["report_csv"] = f.read()
+
+    return results
+
+
+def prune_snapshots(keep=3, root=SNAPSHOT_DIR):
+    """Delete all but the `keep` newest snapshots, never the live one."""
+    live = current_version(root)
+    versions = [
+        name for name in os.listdir(root)
+        if not name.startswith(".") and os.path.isdir(os.path.join(root, name))
+    ]
+    versions.sort(key=lambda name: os.path.getmtime(os.path.join(root, name)), reverse=True)
+
+    for name in versions[keep:]:
+        if name != live:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
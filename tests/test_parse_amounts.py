@@ -0,0 +1,113 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from incentive_pipeline import parse_amounts
+
+
+def parse_one(value):
+    amounts, rejected = parse_amounts(pd.Series([value], dtype=object))
+    return amounts.iloc[0], rejected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("12000", 12000),
+    ("12000 ", 12000),
+    (" 12000.50", 12000.5),
+    ("1,000", 1000),
+    ("1,234,567", 1234567),
+    ("1,20,000", 120000),
+    ("12,34,567.89", 1234567.89),
+    ("1,20,000.00", 120000),
+    ("₹1,20,000", 120000),
+    ("₹ 1,20,000", 120000),
+    ("Rs. 1,000", 1000),
+    ("rs 500", 500),
+    ("INR 7,00,000", 700000),
+    ("-300", -300),
+    ("(5,000)", -5000),
+    ("₹ (2,500.50)", -2500.5),
+    ("₹1,20,000/-", 120000),
+    ("Rs. 5,000 /-", 5000),
+    (" 1,000 INR ", 1000),
+])
+def test_parses_accepted_formats(value, expected):
+    amount, rejected = parse_one(value)
+    assert amount == expected
+    assert rejected == 0
+
+
+@pytest.mark.parametrize("value", [
+    "abc",
+    "1,5",
+    "1,2,3",
+    "12,34",
+    "1,0000",
+    "1 5",
+    "12 34",
+    "1 2 3",
+    "1, 000",
+    "/-",
+    "(5000",
+    "()",
+    "-",
+    "(-5)",
+    "₹",
+])
+def test_rejects_malformed_values(value):
+    amount, rejected = parse_one(value)
+    assert math.isnan(amount)
+    assert rejected == 1
+
+
+@pytest.mark.parametrize("value", ["", "   ", None, np.nan])
+def test_blank_cells_are_missing_not_rejected(value):
+    amount, rejected = parse_one(value)
+    assert math.isnan(amount)
+    assert rejected == 0
+
+
+def test_mixed_numbers_and_strings():
+    values = pd.Series([45000, 12.5, "₹1,000", "bad", "", None, 45000], index=[10, 11, 12, 13, 14, 15, 16])
+    amounts, rejected = parse_amounts(values)
+
+    assert amounts.index.tolist() == values.index.tolist()
+    assert amounts.tolist()[:3] == [45000, 12.5, 1000]
+    assert amounts.iloc[3:6].isna().all()
+    assert amounts.iloc[6] == 45000
+    assert rejected == 1
+
+
+def test_rejected_count_is_per_row():
+    amounts, rejected = parse_amounts(pd.Series(["1,5", "1,5", "1,000", "1,5"]))
+    assert rejected == 3
+    assert amounts.iloc[2] == 1000
+
+
+def test_numeric_column_passes_through():
+    amounts, rejected = parse_amounts(pd.Series([1, 2, 3]))
+    assert amounts.dtype == float
+    assert amounts.tolist() == [1.0, 2.0, 3.0]
+    assert rejected == 0
+
+
+def test_empty_and_all_missing_columns():
+    amounts, rejected = parse_amounts(pd.Series([], dtype=object))
+    assert amounts.empty and rejected == 0
+
+    amounts, rejected = parse_amounts(pd.Series([None, None]))
+    assert amounts.isna().all() and rejected == 0
+
+
+def test_object_column_without_strings():
+    amounts, rejected = parse_amounts(pd.Series([1000, np.int64(2000), 2.5, None], dtype=object))
+    assert amounts.tolist()[:3] == [1000.0, 2000.0, 2.5]
+    assert rejected == 0
+
+
+def test_booleans_are_rejected():
+    amounts, rejected = parse_amounts(pd.Series([True, "1,000"], dtype=object))
+    assert math.isnan(amounts.iloc[0]) and amounts.iloc[1] == 1000
+    assert rejected == 1
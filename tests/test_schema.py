@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from incentive_pipeline import extract_deals, header_changes, resolve_schema
+
+
+def test_exact_header_maps_by_name():
+    schema = resolve_schema(["Deal Owner ", "Amount", "Close Date", "Course Name"])
+    assert schema["columns"] == {"Deal owner": 0, "Amount": 1, "Close Date": 2, "Course": 3}
+    assert schema["warnings"] == []
+
+
+def test_fallback_never_reuses_a_named_column():
+    # Position 2 is the fallback for Close Date, but it is the Amount column
+    schema = resolve_schema(["Foo", "Deal Owner", "Amount", "Course"])
+    assert schema["columns"]["Close Date"] is None
+    assert schema["columns"]["Amount"] == 2
+    assert any("Close Date" in warning for warning in schema["warnings"])
+
+
+def test_positional_fallback_is_reported():
+    schema = resolve_schema(["Owner", "Deal Value", "Product", "Notes", "Close Date"])
+    assert schema["columns"]["Deal owner"] == 0
+    assert any("using column 1 ('Owner')" in warning for warning in schema["warnings"])
+
+
+def test_missing_required_column_raises():
+    with pytest.raises(ValueError):
+        resolve_schema(["Amount", "Deal Value", "Course", "Close Date"])
+
+
+def test_extract_deals_pulls_only_schema_columns():
+    full_df = pd.DataFrame(
+        [["x", "A", "₹1,000", "2024-01-01", "OET"]],
+        columns=["Notes", "Deal Owner", "Amount", "Close Date", "Course"],
+    )
+    deals, schema, rejected = extract_deals(full_df)
+    assert deals.columns.tolist() == ["Deal owner", "Amount", "Close Date", "Course"]
+    assert deals["Amount"].tolist() == [1000.0]
+    assert rejected == 0
+
+
+def test_cached_schema_carries_no_header_change_warnings():
+    a = ["Deal Owner", "Amount", "Close Date", "Course Name"]
+    b = ["Deal Owner", "Amount", "Close Date", "Course Name", "Notes"]
+    for header in (a, b, b, a):
+        assert resolve_schema(header)["warnings"] == []
+
+
+def test_header_changes_are_reported_against_the_previous_header():
+    a = ["Deal Owner", "Amount", "Close Date", "Course Name"]
+    b = ["Deal Owner", "Amount", "Close Date", "Course Name", "Notes"]
+    assert header_changes(None, a) == []
+    assert header_changes(a, a) == []
+    assert header_changes(a, b) == ["Sheet header changed: added ['Notes'], removed []."]
+    assert header_changes(b, a) == ["Sheet header changed: added [], removed ['Notes']."]
+    assert header_changes(a, a[::-1]) == ["Sheet columns were reordered."]
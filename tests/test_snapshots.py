@@ -0,0 +1,117 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import precompute_worker
+import snapshots
+from loadtest.sheet_server import synthetic_sheet
+
+
+def make_results(amount=100):
+    summary = pd.DataFrame({"Deal owner": ["Asha", "Ravi"], "Final_Incentive": [amount, 2.5]})
+    return {
+        "summary": summary,
+        "mixed": pd.DataFrame({"Value": [1, "two", None]}, index=[3, 4, 5]),
+        "rejected_amounts": np.int64(2),
+        "schema": {"header": ["Deal Owner", "Amount"], "warnings": []},
+    }
+
+
+def test_write_then_load_round_trip(tmp_path):
+    results = make_results()
+    snapshots.write_snapshot("v1", results, root=tmp_path)
+    loaded = snapshots.load_snapshot("v1", root=tmp_path)
+
+    pd.testing.assert_frame_equal(loaded["summary"], results["summary"])
+    assert loaded["mixed"].index.tolist() == [3, 4, 5]
+    assert loaded["mixed"]["Value"].tolist()[:2] == ["1", "two"]
+    assert loaded["rejected_amounts"] == 2
+    assert loaded["schema"] == results["schema"]
+    assert loaded["report_csv"] == results["summary"].to_csv(index=False).encode("utf-8")
+
+
+def test_publish_swaps_current(tmp_path):
+    assert snapshots.current_publish(tmp_path) is None
+
+    snapshots.write_snapshot("v1", make_results(), root=tmp_path)
+    snapshots.write_snapshot("v2", make_results(200), root=tmp_path, header_changes=["changed"])
+
+    publish = snapshots.current_publish(tmp_path)
+    assert snapshots.current_version(tmp_path) == "v2"
+    assert publish["header_changes"] == ["changed"]
+    assert snapshots.load_snapshot("v2", root=tmp_path)["summary"]["Final_Incentive"][0] == 200
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".")]
+
+
+def test_republish_writes_a_fresh_publish_record(tmp_path):
+    snapshots.write_snapshot("v1", make_results(), root=tmp_path)
+    first = snapshots.current_publish(tmp_path)
+    snapshots.write_snapshot("v2", make_results(), root=tmp_path)
+    snapshots.write_snapshot("v1", make_results(), root=tmp_path, header_changes=["removed Notes"])
+
+    publish = snapshots.current_publish(tmp_path)
+    assert publish["version"] == "v1"
+    assert publish["published_at"] > first["published_at"]
+    assert publish["header_changes"] == ["removed Notes"]
+
+
+def test_bare_version_in_current_is_still_read(tmp_path):
+    (tmp_path / snapshots.CURRENT_FILE).write_text("old-version\n")
+    assert snapshots.current_version(tmp_path) == "old-version"
+
+
+def test_prune_never_deletes_the_live_snapshot(tmp_path):
+    for i in range(5):
+        snapshots.write_snapshot(f"v{i}", make_results(), root=tmp_path)
+        os.utime(tmp_path / f"v{i}", (i, i))
+    # Point CURRENT back at the oldest snapshot
+    (tmp_path / snapshots.CURRENT_FILE).write_text(json.dumps({"version": "v0"}))
+
+    snapshots.prune_snapshots(keep=2, root=tmp_path)
+
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith("v")) == ["v0", "v3", "v4"]
+
+
+def test_worker_alive_follows_last_checked(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "MAX_AGE", 300)
+    assert not snapshots.worker_alive(tmp_path)
+
+    snapshots.mark_checked(tmp_path)
+    assert snapshots.worker_alive(tmp_path)
+
+    (tmp_path / snapshots.CHECKED_FILE).write_text(str(time.time() - 301))
+    assert not snapshots.worker_alive(tmp_path)
+
+
+@pytest.fixture
+def sheet(monkeypatch):
+    rows = synthetic_sheet(50)
+    monkeypatch.setattr(precompute_worker, "fetch_sheet", lambda url: json.dumps(rows).encode())
+    return rows
+
+
+def test_refresh_skips_an_unchanged_sheet_but_marks_it_checked(tmp_path, sheet):
+    assert precompute_worker.refresh(root=tmp_path)
+    publish = snapshots.current_publish(tmp_path)
+    os.remove(tmp_path / snapshots.CHECKED_FILE)
+
+    assert not precompute_worker.refresh(root=tmp_path)
+    assert snapshots.current_publish(tmp_path) == publish
+    assert snapshots.last_checked(tmp_path) is not None
+
+
+def test_refresh_reports_header_changes_once(tmp_path, sheet):
+    precompute_worker.refresh(root=tmp_path)
+    sheet[0] = sheet[0] + ["Notes"]
+    for row in sheet[1:]:
+        row.append("")
+
+    precompute_worker.refresh(root=tmp_path)
+    assert snapshots.current_publish(tmp_path)["header_changes"] == [
+        "Sheet header changed: added ['Notes'], removed []."
+    ]
+    assert snapshots.last_header(tmp_path)[-1] == "Notes"